@@ -19,11 +19,11 @@
 # cookbook = Cookbook(json.loads(json_string))
 # cookbook.cook('Dough')
 
-from collections import UserDict
 from fractions import Fraction
-from functools import reduce
-from math import lcm
+from functools import cached_property
+from math import gcd, lcm
 from sys import stdout
+from typing import Tuple
 
 
 def __expect_type(var, type):
@@ -38,35 +38,90 @@ def __expect_types(var, *args):
     raise TypeError()
 
 
-def beautify_ratio(ratio: Fraction):
-    if ratio.denominator == 1:
-        return str(ratio.numerator)
+# Recipe trees do their arithmetic on plain (numerator, denominator) pairs of ints.
+# Unlike Fraction they are not reduced after every operation, only when the value is
+# presented, which saves a gcd per operation.
+Pair = Tuple[int, int]
+
+
+def as_pair(value) -> Pair:
+    """
+    Get the (numerator, denominator) pair of provided number.
+    """
+    if not isinstance(value, (int, Fraction)):
+        value = Fraction(value)
+    return (value.numerator, value.denominator)
+
+
+def reduce_pair(pair: Pair) -> Pair:
+    """
+    Get the equivalent pair with coprime parts and a positive denominator.
+    """
+    (n, d) = pair
+    divisor = gcd(n, d)
+    if d < 0:
+        divisor = -divisor
+    return (n // divisor, d // divisor)
+
+
+def beautify_pair(pair: Pair):
+    (n, d) = reduce_pair(pair)
+    if d == 1:
+        return str(n)
     else:
-        return f"({ratio.numerator}/{ratio.denominator})"
+        return f"({n}/{d})"
+
+
+def beautify_ratio(ratio: Fraction):
+    return beautify_pair((ratio.numerator, ratio.denominator))
 
 
 class Recipe:
     def __init__(self, name: str, rate: Fraction, producer: str, ingredients):
         self.name = name
-        if isinstance(rate, Fraction):
-            self.rate = rate
-        else:
-            self.rate = Fraction(rate)
+        self.rate = Fraction(rate)
         self.producer = producer
-        self.ingredients = [
-            (ingredient["rate"], ingredient["name"]) for ingredient in ingredients
-        ]
+        self.ingredients = tuple(
+            (Fraction(ingredient["rate"]), ingredient["name"])
+            for ingredient in ingredients
+        )
+
+    @cached_property
+    def normalized_ingredients(self):
+        """
+        Ingredient rates required to produce a single unit of the recipe.
+        Computed once on the first use.
+        """
+        if self.rate == 0:
+            raise ValueError(f"'{self.name}' recipe has a zero rate!")
+        return tuple(
+            (ingredient_rate / self.rate, ingredient_name)
+            for (ingredient_rate, ingredient_name) in self.ingredients
+        )
+
+    @cached_property
+    def _normalized_pairs(self):
+        """
+        Unreduced (numerator, denominator) version of normalized_ingredients.
+        """
+        if self.rate == 0:
+            raise ValueError(f"'{self.name}' recipe has a zero rate!")
+        (n, d) = (self.rate.numerator, self.rate.denominator)
+        return tuple(
+            ((rate.numerator * d, rate.denominator * n), ingredient_name)
+            for (rate, ingredient_name) in self.ingredients
+        )
 
     def __repr__(self):
         return f"{self.name}@{self.producer}"
 
 
-class Cookbook(UserDict):
+class Cookbook(dict):
     def __init__(self, recipes: list = []):
         """
         Initialize the cookbook with the list of provided recipes.
         """
-        super().__init__()
+        self._tree_cache = {}
         for recipe in recipes:
             self.add(recipe)
 
@@ -85,18 +140,109 @@ class Cookbook(UserDict):
         if name not in self:
             raise KeyError(f"'{name}' is not a known recipe!")
 
-        recipe = self[name]
-        subtree = []
-        if not isinstance(rate, Fraction):
-            rate = Fraction(rate)
-        for (ingredient_rate, ingredient_name) in recipe.ingredients:
-            normalized_rate = ingredient_rate / recipe.rate * rate
-            if depth != 0 and ingredient_name in self:
-                subtree.append(self.tree(ingredient_name, normalized_rate, depth - 1))
-            else:
-                subtree.append((normalized_rate, ingredient_name))
+        return self._tree_unit(name, depth) * rate
+
+    def _tree_unit(self, name, depth):
+        """
+        Get the production tree of the provided item at unit rate.
+        Trees are cached by (name, depth), so shared sub-recipes are only expanded once.
+        Cached trees share their sub-trees, so scaling them is O(1) as it only changes
+        the rate of the root.
+        """
+        # Any negative depth means the tree is not limited
+        depth = max(depth, -1)
+        root = (name, depth)
+        # Expand the recipes post-order with an explicit stack of (name, depth) items,
+        # an item is built once all of its sub-recipes are in the cache.
+        stack = [root]
+        expanding = set()
+        while stack:
+            (name, depth) = stack[-1]
+            if (name, depth) in self._tree_cache:
+                stack.pop()
+                continue
+
+            recipe = self[name]
+            child_depth = max(depth - 1, -1)
+            missing = []
+            if depth != 0:
+                missing = [
+                    (ingredient_name, child_depth)
+                    for (_, ingredient_name) in recipe.ingredients
+                    if ingredient_name in self
+                    and (ingredient_name, child_depth) not in self._tree_cache
+                ]
+            if missing:
+                if (name, depth) in expanding:
+                    raise ValueError(f"'{name}' is a part of its own recipe!")
+                expanding.add((name, depth))
+                # Deduplicate repeated ingredients before pushing them
+                stack.extend(dict.fromkeys(missing))
+                continue
+
+            stack.pop()
+            expanding.discard((name, depth))
+            parts = []
+            for (normalized_rate, ingredient_name) in recipe._normalized_pairs:
+                if depth != 0 and ingredient_name in self:
+                    child = self._tree_cache[(ingredient_name, child_depth)]
+                    parts.append((normalized_rate, child))
+                else:
+                    parts.append((normalized_rate, ingredient_name))
+            self._tree_cache[(name, depth)] = RecipeTree._shared(
+                recipe, (1, 1), tuple(parts)
+            )
+
+        return self._tree_cache[root]
+
+    def __copy__(self):
+        # Copies must not share the tree cache, as they can diverge
+        cookbook = type(self)()
+        cookbook.update(self)
+        return cookbook
+
+    # dict.copy() would return a plain dict
+    copy = __copy__
+
+    def __reduce__(self):
+        # dict restores pickled items before the instance __dict__, so rebuild the
+        # cookbook through __init__ instead of restoring the tree cache
+        return (type(self), (), None, None, iter(self.items()))
+
+    def __setitem__(self, name, recipe):
+        self._tree_cache.clear()
+        super().__setitem__(name, recipe)
+
+    def __delitem__(self, name):
+        self._tree_cache.clear()
+        super().__delitem__(name)
+
+    # Unlike UserDict, dict does not route bulk mutations through __setitem__ and
+    # __delitem__, so they have to drop the cached trees themselves.
+
+    def update(self, *args, **kwargs):
+        self._tree_cache.clear()
+        super().update(*args, **kwargs)
+
+    def setdefault(self, name, recipe=None):
+        self._tree_cache.clear()
+        return super().setdefault(name, recipe)
 
-        return RecipeTree(recipe, rate, subtree)
+    def pop(self, *args):
+        self._tree_cache.clear()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._tree_cache.clear()
+        return super().popitem()
+
+    def clear(self):
+        self._tree_cache.clear()
+        super().clear()
+
+    def __ior__(self, other):
+        self._tree_cache.clear()
+        return super().__ior__(other)
 
     def __repr__(self):
         mid = "".join([f"{recipe}, " for recipe in self.values()])
@@ -106,34 +252,145 @@ class Cookbook(UserDict):
 # TODO: add an iterator to the tree
 class RecipeTree:
     def __init__(self, recipe: Recipe, rate: Fraction, subtree: list):
+        """
+        Create a tree producing provided rate of the recipe out of the subtree of
+        ingredient trees and (rate, name) ingredient leaves.
+        """
         self.recipe = recipe
-        self.rate = rate
-        self.subtree = subtree
+        self._rate = as_pair(rate)
+        self._parts = None
+        self._subtree = subtree
+
+    @staticmethod
+    def _shared(recipe: Recipe, rate: Pair, parts: tuple) -> "RecipeTree":
+        """
+        Create a tree with lazily scaled parts.
+        Parts are (rate, part) tuples where part is either a unit rate tree of the same
+        kind or a name of the ingredient and the rate is required per unit of the tree.
+        Parts are shared between trees, so they should not be modified.
+        """
+        tree = RecipeTree.__new__(RecipeTree)
+        tree.recipe = recipe
+        tree._rate = rate
+        tree._parts = parts
+        tree._subtree = None
+        return tree
+
+    @property
+    def rate(self) -> Fraction:
+        return Fraction(*self._rate)
+
+    @rate.setter
+    def rate(self, rate):
+        # The lazy parts are relative to the rate, so pin them down first
+        self.subtree
+        self._rate = as_pair(rate)
+
+    @property
+    def subtree(self) -> list:
+        if self._subtree is None:
+            self._subtree = [
+                RecipeTree._shared(part.recipe, rate, part._parts)
+                if isinstance(part, RecipeTree)
+                else (Fraction(*rate), part)
+                for (rate, part) in self._children(self._rate)
+            ]
+            self._parts = None
+        return self._subtree
+
+    @subtree.setter
+    def subtree(self, subtree: list):
+        self._parts = None
+        self._subtree = subtree
+
+    def _children(self, rate: Pair) -> list:
+        """
+        Get (rate, part) pairs of the ingredients when this tree produces provided rate.
+        Part is either a RecipeTree or a name of the ingredient.
+        """
+        (n, d) = rate
+        if self._parts is not None:
+            return [((n * pn, d * pd), part) for ((pn, pd), part) in self._parts]
+        return [
+            (node._rate, node)
+            if isinstance(node, RecipeTree)
+            else (as_pair(node[0]), node[1])
+            for node in self._subtree
+        ]
+
+    def _producer_rate(self, rate: Pair) -> Pair:
+        """
+        Get the number of producers required to produce provided rate of the recipe.
+        """
+        (n, d) = rate
+        recipe_rate = self.recipe.rate
+        (rn, rd) = (recipe_rate.numerator, recipe_rate.denominator)
+        if rn == 0:
+            raise ValueError(f"'{self.recipe.name}' recipe has a zero rate!")
+        return (n * rd, d * rn)
 
     def print(self, out=stdout, indent="\t"):
-        def r_print(node: RecipeTree, out, indent: str, depth: int):
-            normalized_rate = node.rate / node.recipe.rate
-            out.write(
-                f"{indent * depth}{beautify_ratio(node.rate)}x'{node.recipe.name}' @ {beautify_ratio(normalized_rate)}x'{node.recipe.producer}':\n"
-            )
-            for tree in node.subtree:
-                if isinstance(tree, RecipeTree):
-                    r_print(tree, out, indent, depth + 1)
-                else:
-                    (rate, item) = tree
-                    out.write(
-                        f"{indent * (depth + 1)}{beautify_ratio(rate)}x'{item}'\n"
-                    )
+        # (depth, rate, node) items, popped in pre-order
+        stack = [(0, self._rate, self)]
+        while stack:
+            (depth, rate, node) = stack.pop()
+            if isinstance(node, RecipeTree):
+                out.write(f"{indent * depth}{node._head(rate)}:\n")
+                children = node._children(rate)
+                children.reverse()
+                depth += 1
+                stack.extend(
+                    [(depth, child_rate, child) for (child_rate, child) in children]
+                )
+            else:
+                out.write(f"{indent * depth}{beautify_pair(rate)}x'{node}'\n")
 
-        r_print(self, out, indent, 0)
+    def _head(self, rate: Pair) -> str:
+        """
+        Describe provided rate of the recipe and its producer.
+        """
+        normalized_rate = self._producer_rate(rate)
+        return f"{beautify_pair(rate)}x'{self.recipe.name}' @ {beautify_pair(normalized_rate)}x'{self.recipe.producer}'"
 
     def __repr__(self):
-        normalized_rate = self.rate / self.recipe.rate
-        return f"{beautify_ratio(self.rate)}x'{self.recipe.name}' @ {beautify_ratio(normalized_rate)}x'{self.recipe.producer}' : {self.subtree}"
+        pieces = []
+        # (rate, node) items and literal strings to output, popped in pre-order
+        stack = [(self._rate, self)]
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                pieces.append(item)
+                continue
+            (rate, node) = item
+            if isinstance(node, RecipeTree):
+                pieces.append(f"{node._head(rate)} : [")
+                stack.append("]")
+                if node._parts is None:
+                    # Keep the leaves exactly as they were provided
+                    children = [
+                        (child._rate, child)
+                        if isinstance(child, RecipeTree)
+                        else repr(child)
+                        for child in node._subtree
+                    ]
+                else:
+                    children = node._children(rate)
+                for i in reversed(range(len(children))):
+                    stack.append(children[i])
+                    if i > 0:
+                        stack.append(", ")
+            else:
+                (n, d) = reduce_pair(rate)
+                pieces.append(f"(Fraction({n}, {d}), {node!r})")
+        return "".join(pieces)
 
     def __mul__(self, num):
-        if not isinstance(num, Fraction):
-            num = Fraction(num)
+        (n, d) = as_pair(num)
+        if self._parts is not None:
+            (rn, rd) = self._rate
+            return RecipeTree._shared(self.recipe, (rn * n, rd * d), self._parts)
+
+        num = Fraction(n, d)
 
         def mul(node, num):
             if isinstance(node, RecipeTree):
@@ -141,7 +398,7 @@ class RecipeTree:
             else:
                 return (node[0] * num, node[1])
 
-        subtree = [mul(node, num) for node in self.subtree]
+        subtree = [mul(node, num) for node in self._subtree]
         return RecipeTree(self.recipe, self.rate * num, subtree)
 
     def lcm(self):
@@ -150,11 +407,21 @@ class RecipeTree:
         If the tree is multiplied by the result of this, all components will occupy 100%
         of their producers.
         """
-
-        def _lcm(num, node):
-            if isinstance(node, RecipeTree):
-                return lcm(node.lcm(), num)
-            else:
-                return lcm(node[0].denominator, num)
-
-        return reduce(_lcm, self.subtree, (self.rate / self.recipe.rate).denominator)
+        result = 1
+        # (rate, node) items, so the shared parts do not have to be scaled
+        stack = [(self._rate, self)]
+        while stack:
+            (rate, node) = stack.pop()
+            (n, d) = node._producer_rate(rate)
+            # The rates are not reduced, result * n / d being whole already means the
+            # reduced denominator divides the result
+            if result * n % d:
+                result = lcm(result, d // gcd(n, d))
+            for (child_rate, child) in node._children(rate):
+                if isinstance(child, RecipeTree):
+                    stack.append((child_rate, child))
+                else:
+                    (n, d) = child_rate
+                    if result * n % d:
+                        result = lcm(result, d // gcd(n, d))
+        return result
@@ -2,6 +2,7 @@
 # https://en.wikipedia.org/wiki/Fermat%27s_spiral
 
 import turtle
+import numpy as np
 from math import sin, cos, pi, sqrt, log, log2, atan2, ceil, e
 
 SAMPLE_COUNT = 256
@@ -13,13 +14,19 @@ DOT_RADIUS = sqrt(OUTER_RADIUS * OUTER_RADIUS / SAMPLE_COUNT)
 turtle.color("blue")
 turtle.dot(OUTER_RADIUS * 2)
 turtle.speed(0)
+# Draw everything in a single screen update
+turtle.tracer(0, 0)
 turtle.color("black")
 
+indices = np.arange(SAMPLE_COUNT)
+radii = np.sqrt(indices / SAMPLE_COUNT) * OUTER_RADIUS
+angles = indices * GOLDEN_ANGLE
+xs = radii * np.cos(angles)
+ys = radii * np.sin(angles)
+
 for i in range(SAMPLE_COUNT):
-    r = sqrt(i / SAMPLE_COUNT) * OUTER_RADIUS
-    x = r * cos(i * GOLDEN_ANGLE)
-    y = r * sin(i * GOLDEN_ANGLE)
-    turtle.goto(x, y)
+    turtle.goto(xs[i], ys[i])
     turtle.dot(DOT_RADIUS * 2, "red")
 
+turtle.update()
 turtle.done()
@@ -1,39 +1,75 @@
 # Optimized sequence numbers generator to find 666th partition number
 # Exercise following https://www.youtube.com/watch?v=iJ8pnCO0nTY
+#
+# The recurrence is compiled with numba while the numbers fit into int64.
+# Beyond that numba would silently wrap around, so larger sequences run the same
+# recurrence uncompiled with arbitrary precision python integers. Keeping a single
+# native kernel with a GMP-backed extension would avoid the fallback, but is not
+# worth the build complexity for a throwaway script.
+# numba (and numpy) are only imported when a short enough sequence is requested,
+# so the long sequences do not pay for loading them.
+
+from functools import lru_cache
+
+# Largest sequence length for which every intermediate sum fits into int64.
+# Computing p(i) first sums p(i - 1) + p(i - 2), which overflows for i = 396 even
+# though p(396) itself fits. p(394) + p(393) is the largest partial sum below 2^63.
+INT64_SEQUENCE_LIMIT = 396
+
+
+def _fill_partition_numbers(partition_numbers) -> None:
+    """
+    Fill the provided buffer with partition numbers in-place.
+
+    Uses Euler's pentagonal number theorem:
+    p(i) = sum((-1)^(k+1) * (p(i - g(k)) + p(i - g(-k)))) for k = 1, 2, ...
+    where g(k) = k(3k-1)/2 are generalized pentagonal numbers, so only O(sqrt(i))
+    previous numbers contribute to each next one.
+    """
+    partition_numbers[0] = 1
+    for i in range(1, len(partition_numbers)):
+        next_num = 0
+        k = 1
+        while True:
+            pentagonal = k * (3 * k - 1) // 2
+            if pentagonal > i:
+                break
+            # The operation sequence is ++--++--++-- etc, computed without a branch
+            sign = ((k & 1) << 1) - 1
+            next_num += sign * partition_numbers[i - pentagonal]
+            # g(-k) = g(k) + k
+            pentagonal += k
+            if pentagonal <= i:
+                next_num += sign * partition_numbers[i - pentagonal]
+            k += 1
+        partition_numbers[i] = next_num
+
+
+@lru_cache(maxsize=None)
+def _compiled_fill_partition_numbers():
+    """
+    Get the numba compiled version of _fill_partition_numbers().
+    """
+    from numba import njit
+
+    return njit(cache=True)(_fill_partition_numbers)
 
 
 def generate_n_partition_numbers(n: int):
     """
     A partition number of N is the number of unique sums of positive integers that result in N.
     """
-    partition_numbers = [1, 1]
-    # Sequence of negative indexes to operate
-    # The operation sequence is ++--++--++-- etc
-    operand_indexes = [1]
-    # Index of the current break_distance in the sequence of break_distances
-    break_sequence_index = 0
-    # Index at which a new operand needs to be appended to the operand list
-    next_op_index = 2
-    for i in range(len(partition_numbers), n):
-        if i >= next_op_index:
-            break_sequence_index += 1
-            break_distance = 0
-            if break_sequence_index & 0b1 == 0:
-                break_distance = int(break_sequence_index / 2) + 1
-            else:
-                break_distance = break_sequence_index + 2
-            operand_indexes.append(next_op_index)
-            next_op_index += break_distance
+    if n > INT64_SEQUENCE_LIMIT:
+        # Run the same recurrence in the interpreter with arbitrary precision integers
+        partition_numbers = [0] * n
+        _fill_partition_numbers(partition_numbers)
+        return partition_numbers
 
-        next_num = 0
-        for (idx, op_index) in enumerate(operand_indexes):
-            # operand is plus if the idx or idx-1 is divisible by 4
-            if idx & 0b10 == 0:
-                next_num += partition_numbers[-op_index]
-            else:
-                next_num -= partition_numbers[-op_index]
-        partition_numbers.append(next_num)
-    return partition_numbers
+    import numpy as np
+
+    partition_numbers = np.empty(max(n, 2), dtype=np.int64)
+    _compiled_fill_partition_numbers()(partition_numbers)
+    return partition_numbers.tolist()
 
 
 partition_numbers = generate_n_partition_numbers(667)
@@ -7,6 +7,9 @@
 
 from typing import Callable, Iterable, List, MutableSequence, Optional, Tuple
 
+import numpy as np
+from numba import njit
+
 # (clue, solution) pairs
 EXAMPLE_PUZZLES = (
     (
@@ -54,12 +57,104 @@ def filter_mut(seq: MutableSequence, pred: Optional[Callable] = None):
     if pred is None:
         pred = lambda x: bool(x)
 
+    count = len(seq)
+    seq[:] = [x for x in seq if not pred(x)]
+    return count - len(seq)
+
+
+def mask_to_vals(mask: int) -> List[int]:
+    """
+    Convert a bitmask of possible values into a list of the values.
+    Bit k being set means the value k+1 is possible.
+    """
+    mask = int(mask)
+    return [bit + 1 for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+
+def vals_to_mask(vals: Iterable[int]) -> int:
+    """
+    Convert a collection of possible values into a bitmask.
+    """
+    mask = 0
+    for val in vals:
+        mask |= 1 << (val - 1)
+    return mask
+
+
+@njit(cache=True)
+def _popcount(mask: int) -> int:
+    """
+    Count the set bits of the provided mask.
+    """
+    count = 0
+    while mask:
+        mask &= mask - 1
+        count += 1
+    return count
+
+
+@njit(cache=True)
+def _eliminate_core(vals: np.ndarray, bit: int, x: int, y: int) -> int:
+    """
+    Eliminate provided value bit from the column x and row y of the (y, x) grid.
+    Returns the number of cells the bit was eliminated from.
+    """
+    n = vals.shape[0]
+    keep = ((1 << n) - 1) ^ bit
     count = 0
-    for i in reversed(range(len(seq))):
-        if pred(seq[i]):
-            seq.pop(i)
+    for i in range(n):
+        if vals[i, x] & bit:
+            vals[i, x] &= keep
+            count += 1
+        if vals[y, i] & bit:
+            vals[y, i] &= keep
             count += 1
+    return count
+
+
+@njit(cache=True)
+def pin_singles_core(vals: np.ndarray, n: int) -> int:
+    """
+    Pin any values that occur once in a row or a column of the (y, x) grid of bitmasks.
+    Returns number of values pinned.
+    """
+    count = 0
+    for y in range(n):
+        for x in range(n):
+            mask = vals[y, x]
+            if _popcount(mask) <= 1:
+                continue
+            for b in range(n):
+                bit = 1 << b
+                if not mask & bit:
+                    continue
+                in_col = 0
+                in_row = 0
+                for i in range(n):
+                    in_col += (vals[i, x] & bit) != 0
+                    in_row += (vals[y, i] & bit) != 0
+                if in_col == 1 or in_row == 1:
+                    _eliminate_core(vals, bit, x, y)
+                    vals[y, x] = bit
+                    count += 1
+                    break
+    return count
 
+
+@njit(cache=True)
+def prune_core(vals: np.ndarray, n: int) -> int:
+    """
+    Eliminate any values that contradict pinned ones in the (y, x) grid of bitmasks.
+    Returns number of values eliminated.
+    """
+    count = 0
+    for y in range(n):
+        for x in range(n):
+            mask = vals[y, x]
+            if _popcount(mask) == 1:
+                # take 1 as the value will have been eliminated from the pinned cell
+                count += _eliminate_core(vals, mask, x, y) - 1
+                vals[y, x] = mask
     return count
 
 
@@ -67,50 +162,57 @@ class State:
     """
     State stores possible values for each of the skyscraper at a given position
     and provides a convenient way to retreive said values with 2 indices.
+
+    Possible values of each cell are stored as a bitmask, bit k being set means
+    the value k+1 is possible.
     """
 
     def __init__(self, n: int) -> None:
+        assert n <= 16, "cell bitmasks are 16 bits wide"
         self.n = n
-        self._vals = [[i + 1 for i in range(n)] for x in range(n ** 2)]
+        self._full = (1 << n) - 1
+        self._vals = np.full(n ** 2, self._full, dtype=np.uint16)
+        # (y, x) indexed view of the values
+        self._grid = self._vals.reshape(n, n)
 
-    def _index(self, indices: Tuple[int, int]) -> int:
+    def _row_view(self, y: int) -> np.ndarray:
         """
-        Get the flat index from combined indices.
+        Get a writable view of the bitmasks of the provided row.
         """
-        if not isinstance(indices, tuple):
-            raise TypeError
-        if len(indices) != 2:
-            raise KeyError
-        if any(
-            (
-                indices[0] < 0,
-                indices[0] >= self.n,
-                indices[1] < 0,
-                indices[1] >= self.n,
-            )
-        ):
-            raise IndexError
-        return indices[1] * self.n + indices[0]
+        return self._grid[y, :]
+
+    def _col_view(self, x: int) -> np.ndarray:
+        """
+        Get a writable view of the bitmasks of the provided column.
+        """
+        return self._grid[:, x]
 
     def __getitem__(self, indices: Tuple[int, int]) -> List[int]:
-        return self._vals[self._index(indices)]
+        (x, y) = indices
+        # numpy would wrap negative indices around
+        if x < 0 or y < 0:
+            raise IndexError
+        return mask_to_vals(self._grid[y, x])
 
     def __setitem__(self, indices: Tuple[int, int], value: List[int]) -> None:
         if not isinstance(value, list):
             raise TypeError
-        self._vals[self._index(indices)] = value
+        (x, y) = indices
+        if x < 0 or y < 0:
+            raise IndexError
+        self._grid[y, x] = vals_to_mask(value)
 
     def __str__(self) -> str:
-        padding = max(len(vals) for vals in self._vals)
+        padding = max(int(mask).bit_count() for mask in self._vals)
         return "\n".join(row_to_str(row, padding) for row in self.rows())
 
     def row(self, y: int):
-        for x in range(self.n):
-            yield self[x, y]
+        for mask in self._row_view(y):
+            yield mask_to_vals(mask)
 
     def col(self, x: int):
-        for y in range(self.n):
-            yield self[x, y]
+        for mask in self._col_view(x):
+            yield mask_to_vals(mask)
 
     def rows(self):
         for y in range(self.n):
@@ -120,43 +222,41 @@ class State:
         for x in range(self.n):
             yield self.col(x)
 
+    def _eliminate(self, val: int, cells: np.ndarray) -> int:
+        """
+        Eliminate provided value from the provided view of cells.
+        Returns number of cells the value was eliminated from.
+        """
+        bit = 1 << (val - 1)
+        count = int(np.count_nonzero(cells & bit))
+        cells &= self._full & ~bit
+        return count
+
     def eliminate_row(self, val: int, y: int) -> int:
         """
         Eliminate provided value from the provided row in the state.
         Returns number of elements eliminated from the row.
         """
-        count = 0
-        for vals in self.row(y):
-            count += filter_mut(vals, lambda x: x == val)
-        return count
+        return self._eliminate(val, self._row_view(y))
 
     def eliminate_col(self, val: int, x: int) -> int:
         """
         Eliminate provided value from the provided column in the state.
         Returns number of elements eliminated from the row.
         """
-        count = 0
-        for vals in self.col(x):
-            count += filter_mut(vals, lambda x: x == val)
-        return count
+        return self._eliminate(val, self._col_view(x))
 
     def count_in_row(self, val: int, y: int) -> int:
         """
         Count the number of occurrences of provided value in the given row.
         """
-        count = 0
-        for vals in self.row(y):
-            count += int(val in vals)
-        return count
+        return int(np.count_nonzero(self._row_view(y) & (1 << (val - 1))))
 
     def count_in_col(self, val: int, x: int) -> int:
         """
         Count the number of occurrences of provided value in the given column.
         """
-        count = 0
-        for vals in self.col(x):
-            count += int(val in vals)
-        return count
+        return int(np.count_nonzero(self._col_view(x) & (1 << (val - 1))))
 
     def pin(self, val: int, x: int, y: int) -> int:
         """
@@ -164,9 +264,10 @@ class State:
         Eliminates the value from the column and row.
         Returns the number of cells the value was eliminated from.
         """
-        assert val in self[x, y]
+        bit = 1 << (val - 1)
+        assert self._grid[y, x] & bit
         count = self.eliminate_col(val, x) + self.eliminate_row(val, y)
-        self[x, y].append(val)
+        self._grid[y, x] = bit
         # The value was re-introduced after elimination
         return count - 1
 
@@ -175,32 +276,24 @@ class State:
         Pin any values that occur once in a row or a column.
         Returns number of values pinned.
         """
-        count = 0
-        for y in range(self.n):
-            for x in range(self.n):
-                if len(self[x, y]) > 1:
-                    for val in self[x, y]:
-                        if (
-                            self.count_in_col(val, x) == 1
-                            or self.count_in_row(val, y) == 1
-                        ):
-                            self.pin(val, x, y)
-                            count += 1
-        return count
+        return pin_singles_core(self._grid, self.n)
 
     def prune(self) -> int:
         """
         Eliminate any values that contradict pinned ones.
         """
-        count = 0
-        for y in range(self.n):
-            for x in range(self.n):
-                if len(self[x, y]) == 1:
-                    val = self[x, y][0]
-                    # take 1 as the value will have been eliminated from the allowed cell
-                    count += self.eliminate_col(val, x) + self.eliminate_row(val, y) - 1
-                    self[x, y].append(val)
-        return count
+        return prune_core(self._grid, self.n)
+
+    def _clue_masks(self, clues: np.ndarray) -> np.ndarray:
+        """
+        Get bitmasks of values allowed by the provided edge of clues.
+        The result is indexed by [distance from the edge, clue index].
+        """
+        dist = np.arange(self.n)[:, np.newaxis]
+        max_val = np.clip(self.n + 2 + dist - clues[np.newaxis, :], 0, self.n)
+        masks = (1 << max_val) - 1
+        masks[:, clues == 0] = self._full
+        return masks.astype(np.uint16)
 
     def apply_clue_edges(self, clues: List[int]) -> None:
         """
@@ -210,37 +303,16 @@ class State:
         """
         assert len(clues) == self.n * 4
 
+        grid = self._grid
+        edges = np.asarray(clues, dtype=np.int64).reshape(4, self.n)
         # top->bottom clues
-        for i, clue in enumerate(clues[self.n * 0 : self.n * 1]):
-            if clue == 0:
-                continue
-            for values in self.col(i):
-                dist = i
-                filter_mut(values, lambda x: x + clue > self.n + 2 + dist)
-
+        grid &= self._clue_masks(edges[0])
         # right->left
-        for i, clue in enumerate(clues[self.n * 1 : self.n * 2]):
-            if clue == 0:
-                continue
-            for values in self.row(i):
-                dist = self.n - i - 1
-                filter_mut(values, lambda x: x + clue > self.n + 2 + dist)
-
+        grid &= self._clue_masks(edges[1])[::-1, :].T
         # bottom->top
-        for i, clue in enumerate(clues[self.n * 2 : self.n * 3]):
-            if clue == 0:
-                continue
-            for values in self.col(self.n - i - 1):
-                dist = self.n - i - 1
-                filter_mut(values, lambda x: x + clue > self.n + 2 + dist)
-
+        grid &= self._clue_masks(edges[2])[::-1, ::-1]
         # left->right
-        for i, clue in enumerate(clues[self.n * 3 : self.n * 4]):
-            if clue == 0:
-                continue
-            for values in self.row(self.n - i - 1):
-                dist = i
-                filter_mut(values, lambda x: x + clue > self.n + 2 + dist)
+        grid &= self._clue_masks(edges[3]).T[::-1, :]
 
     def collapse(self) -> Tuple[Tuple[int]]:
         """
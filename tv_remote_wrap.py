@@ -1,5 +1,6 @@
 # A solution for https://www.codewars.com/kata/5b2c2c95b6989da552000120/python
 
+from string import ascii_letters, ascii_uppercase
 from typing import Tuple
 
 # The keyboard is a collection of symbols in a regular grid.
@@ -17,6 +18,19 @@ SHIFT_INDEX = (0, 5)
 
 Index = Tuple[int, int]
 
+# The keyboard is ASCII, so plain set lookups replace the unicode-aware str methods.
+LETTERS = frozenset(ascii_letters)
+UPPER_LETTERS = frozenset(ascii_uppercase)
+
+
+# (x, y) indices of each symbol on the keyboard.
+KEY_INDEX = {
+    char: (x, y)
+    for (y, row) in enumerate(KEYBOARD)
+    for (x, char) in enumerate(row)
+    if char
+}
+
 
 def find(sym: str) -> Tuple[int, int]:
     """
@@ -24,20 +38,13 @@ def find(sym: str) -> Tuple[int, int]:
 
     Returns (x, y) indices of the symbol or None.
     """
-    sym = sym.lower()
-    for (y, row) in enumerate(KEYBOARD):
-        for (x, char) in enumerate(row):
-            if char == sym:
-                return (x, y)
-    return None
+    return KEY_INDEX.get(sym.lower())
 
 
-def index_dist(a: Tuple[int, int], b: Tuple[int, int]) -> int:
+def _wrapped_dist(ax: int, ay: int, bx: int, by: int) -> int:
     """
-    Get the minimum number of button presses required to go from a to b.
+    Get the minimum number of button presses required to go from (ax, ay) to (bx, by).
     """
-    (ax, ay) = a
-    (bx, by) = b
     dx = abs(ax - bx)
     # wrap horizontally
     if dx > 4:
@@ -50,6 +57,33 @@ def index_dist(a: Tuple[int, int], b: Tuple[int, int]) -> int:
     return dx + dy
 
 
+KEYBOARD_WIDTH = len(KEYBOARD[0])
+KEYBOARD_HEIGHT = len(KEYBOARD)
+
+# Distances between every pair of keys, indexed by flat (y * KEYBOARD_WIDTH + x) indices.
+DIST = [
+    [
+        _wrapped_dist(
+            a % KEYBOARD_WIDTH,
+            a // KEYBOARD_WIDTH,
+            b % KEYBOARD_WIDTH,
+            b // KEYBOARD_WIDTH,
+        )
+        for b in range(KEYBOARD_WIDTH * KEYBOARD_HEIGHT)
+    ]
+    for a in range(KEYBOARD_WIDTH * KEYBOARD_HEIGHT)
+]
+
+
+def index_dist(a: Tuple[int, int], b: Tuple[int, int]) -> int:
+    """
+    Get the minimum number of button presses required to go from a to b.
+    """
+    (ax, ay) = a
+    (bx, by) = b
+    return DIST[ay * KEYBOARD_WIDTH + ax][by * KEYBOARD_WIDTH + bx]
+
+
 class State:
     """
     Current state of the keyboard.
@@ -75,7 +109,7 @@ class State:
         Returns the minimum number of button presses required to achieve the press.
         """
         steps = 0
-        if char.isalpha() and (self.upper != char.isupper()):
+        if char in LETTERS and (self.upper != (char in UPPER_LETTERS)):
             # Press SHIFT
             steps = self.walkTo(SHIFT_INDEX) + 1
             self.upper = not self.upper